@@ -0,0 +1,149 @@
+"""Streaming gzip/brotli compression for text responses.
+
+Brotli is used when the ``brotli`` package is installed and the client
+accepts it, gzip otherwise. Responses that already carry a
+Content-Encoding (e.g. the pre-compressed index page) pass through.
+"""
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+MINIMUM_SIZE = 1024  # bytes; smaller bodies are not worth the CPU or the headers
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4  # fast enough for per-request use; cached pages use 11
+
+COMPRESSIBLE_TYPES = (
+    b"text/",
+    b"application/json",
+    b"application/javascript",
+    b"application/xml",
+    b"image/svg+xml",
+)
+
+
+def choose_encoding(accept_encoding: str):
+    """Pick "br", "gzip" or None from an Accept-Encoding header value."""
+    if not accept_encoding:
+        return None
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str, best: bool = False) -> bytes:
+    """One-shot compression, used for bodies that are cached."""
+    if encoding == "br":
+        return brotli.compress(body, quality=11 if best else BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=9 if best else GZIP_LEVEL, mtime=0)
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._obj = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._flush = self._obj.flush
+            self._finish = self._obj.finish
+            self.compress = self._obj.process
+        else:
+            self._obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+            self.compress = self._obj.compress
+            self._flush = lambda: self._obj.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._obj.flush
+
+    def chunk(self, data: bytes, more: bool) -> bytes:
+        # sync-flush intermediate chunks so streamed responses reach the client promptly
+        return self.compress(data) + (self._flush() if more else self._finish())
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing text bodies of at least ``minimum_size`` bytes."""
+
+    def __init__(self, app, minimum_size: int = MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                encoding = choose_encoding(value.decode("latin-1"))
+                break
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _Responder(self.app, encoding, self.minimum_size)(scope, receive, send)
+
+
+class _Responder:
+    def __init__(self, app, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send = None
+        self.start_message = None
+        self.compressor = None  # set once we decide to compress
+        self.passthrough = False
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self.send_wrapper)
+
+    def _eligible(self, message) -> bool:
+        if message["status"] < 200 or message["status"] in (204, 206, 304):
+            return False
+        content_type = b""
+        for name, value in message.get("headers", ()):
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    async def send_wrapper(self, message):
+        kind = message["type"]
+        if kind == "http.response.start":
+            # hold the headers until the first body chunk tells us the size
+            self.start_message = message
+            self.passthrough = not self._eligible(message)
+            if self.passthrough:
+                await self.send(message)
+            return
+        if kind != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more = message.get("more_body", False)
+        if self.compressor is None:
+            if not more and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+            self.compressor = _Compressor(self.encoding)
+            data = self.compressor.chunk(body, more)
+            headers = [(k, v) for k, v in self.start_message.get("headers", ()) if k != b"content-length"]
+            headers.append((b"content-encoding", self.encoding.encode()))
+            headers.append((b"vary", b"Accept-Encoding"))
+            if not more:
+                headers.append((b"content-length", str(len(data)).encode()))
+            await self.send({**self.start_message, "headers": headers})
+            await self.send({"type": "http.response.body", "body": data, "more_body": more})
+            return
+
+        await self.send({"type": "http.response.body", "body": self.compressor.chunk(body, more), "more_body": more})
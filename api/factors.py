@@ -0,0 +1,150 @@
+"""Emission-factor registry shared by all calculators.
+
+Factors are loaded from ``data/emission_factors.json`` into an immutable
+``FactorSnapshot`` of array-backed tables addressed by integer codes. The
+registry swaps in a new snapshot when the data file (or the recommendation
+rules) change on disk; the swap is a single reference assignment, so a
+request that grabbed a snapshot keeps using it until it finishes.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from array import array
+from pathlib import Path
+
+import recommendations
+
+FACTORS_PATH = Path(os.getenv("EMISSION_FACTORS_PATH", Path(__file__).parent.resolve() / "data" / "emission_factors.json"))
+RELOAD_CHECK_INTERVAL = float(os.getenv("FACTORS_RELOAD_INTERVAL", "5"))  # seconds between mtime checks
+
+
+class FactorTable:
+    """Name -> float lookup backed by a contiguous array; codes are array indices."""
+    __slots__ = ("names", "codes", "values")
+
+    def __init__(self, mapping: dict):
+        self.names = tuple(mapping)
+        self.codes = {name: i for i, name in enumerate(self.names)}
+        self.values = array("d", (float(v) for v in mapping.values()))
+
+    def code(self, name) -> int:
+        return self.codes.get(name, -1)
+
+    def get(self, name, default: float = 0.0) -> float:
+        i = self.codes.get(name)
+        return self.values[i] if i is not None else default
+
+    def as_dict(self) -> dict:
+        return dict(zip(self.names, self.values))
+
+
+class FactorSnapshot:
+    """One immutable version of every emission factor plus the indexes derived from it."""
+
+    def __init__(self, data: dict, version: str, rules: dict):
+        self.version = version
+        self.credit_price = float(data["credit_prices"]["default"])
+        self.packaging_credit_price = float(data["credit_prices"]["packaging"])
+
+        self.industries = FactorTable(data["industries"])
+        self.default_industry_factor = self.industries.get(data["default_industry"])
+        self.energy_sources = FactorTable(data["energy_sources"])
+        self.default_energy_multiplier = self.energy_sources.get(data["default_energy_source"])
+
+        self.transport = FactorTable(data["transport_modes"])
+        self.default_transport_factor = float(data["default_transport_factor"])
+        self.non_recyclable = frozenset(data["non_recyclable_categories"])
+
+        # materials flattened to (category, subtype) codes over parallel arrays
+        self.material_codes = {}
+        emission, recycled = array("d"), array("d")
+        for category, subtypes in data["materials"].items():
+            for subtype, entry in subtypes.items():
+                self.material_codes[(category, subtype)] = len(emission)
+                emission.append(float(entry["emission_factor"]))
+                recycled.append(float(entry["recycled_factor"]))
+        self.material_emission = emission
+        self.material_recycled = recycled
+
+        # catalog as served by /api/packaging-materials, built once per version
+        self.materials_catalog = dict(data["materials"])
+        self.materials_catalog["carbon_credit_price"] = self.packaging_credit_price
+        self.industry_reference = tuple(data.get("industry_reference", ()))
+
+        self.recommender = recommendations.RecommendationIndex(
+            data["materials"], self.transport.as_dict(), self.non_recyclable,
+            self.default_transport_factor, rules,
+        )
+
+    def material_factor(self, category: str, subtype: str, is_recycled) -> float:
+        """Effective emission factor for a packaging material, 0 if unknown."""
+        code = self.material_codes.get((category, subtype))
+        if code is None:
+            return 0.0
+        if is_recycled and category not in self.non_recyclable:
+            return self.material_recycled[code]
+        return self.material_emission[code]
+
+    def transport_factor(self, mode: str) -> float:
+        return self.transport.get(mode, self.default_transport_factor)
+
+
+def _mtime(path: Path) -> float:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return 0.0
+
+
+class FactorRegistry:
+    def __init__(self, path: Path = FACTORS_PATH, rules_path: Path = recommendations.RULES_PATH,
+                 check_interval: float = RELOAD_CHECK_INTERVAL):
+        self.path = Path(path)
+        self.rules_path = Path(rules_path)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtimes = None
+        self._next_check = 0.0
+        self._current = None
+        self.reload()
+
+    def _load(self) -> FactorSnapshot:
+        raw = self.path.read_bytes()
+        data = json.loads(raw)
+        rules = recommendations.load_rules(self.rules_path)
+        digest = hashlib.sha1(raw + json.dumps(rules, sort_keys=True).encode()).hexdigest()[:8]
+        return FactorSnapshot(data, f"{data.get('version', '0')}+{digest}", rules)
+
+    def reload(self) -> FactorSnapshot:
+        """Build a new snapshot from disk and swap it in; keeps the old one on error."""
+        with self._lock:
+            mtimes = (_mtime(self.path), _mtime(self.rules_path))
+            try:
+                snapshot = self._load()
+            except Exception as e:
+                if self._current is None:
+                    raise
+                print("WARN: emission factor reload failed, keeping version", self._current.version, "-", e)
+                self._mtimes = mtimes
+                return self._current
+            self._mtimes = mtimes
+            self._current = snapshot
+            return snapshot
+
+    def snapshot(self) -> FactorSnapshot:
+        """Current snapshot. Checks the data files for changes at most every ``check_interval`` seconds."""
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            if (_mtime(self.path), _mtime(self.rules_path)) != self._mtimes:
+                return self.reload()
+        return self._current
+
+    @property
+    def version(self) -> str:
+        return self._current.version
+
+
+registry = FactorRegistry()
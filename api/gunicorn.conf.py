@@ -0,0 +1,97 @@
+# Production serving profile: gunicorn master + uvicorn workers.
+#
+#   gunicorn -c gunicorn.conf.py main:app
+#
+# See SERVING.md for reload procedures and the throughput comparison.
+import gc
+import os
+import subprocess
+import sys
+
+
+def _available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))  # respects taskset / container cpusets
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+# Handlers are mostly sync and CPU-bound (pbkdf2, calculations), so one worker per core;
+# keep at least two so one slow request never blocks the whole server.
+workers = int(os.getenv("WEB_CONCURRENCY", "0")) or max(2, _available_cpus())
+
+# Import the app once in the master: factor tables, the recommendation index,
+# compiled templates and regexes are then shared copy-on-write by all workers.
+preload_app = True
+
+# Recycle workers to bound memory growth; jitter keeps them from restarting together.
+max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "1000"))
+
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))  # drain window on reload/shutdown
+keepalive = 5
+
+pidfile = os.getenv("GUNICORN_PIDFILE", "/tmp/carbontracker-gunicorn.pid")
+# heartbeat files on tmpfs so a slow disk cannot get workers killed
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+accesslog = os.getenv("ACCESS_LOG") or None
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
+
+# Background jobs run in one dispatcher process owned by the master instead of in a
+# web worker, so HUP reloads and max_requests recycling never interrupt them. Set
+# before the app is preloaded; the workers then only enqueue (see jobs.py).
+os.environ.setdefault("JOB_DISPATCHER", "external")
+
+
+def _ensure_dispatcher(server):
+    # the handle lives on the arbiter: HUP re-executes this file, resetting its globals
+    if os.environ["JOB_DISPATCHER"] != "external":
+        return
+    dispatcher = getattr(server, "job_dispatcher", None)
+    if dispatcher is not None and dispatcher.poll() is None:
+        return
+    if dispatcher is not None:
+        server.log.warning("Job dispatcher (pid:%s) exited, starting a new one", dispatcher.pid)
+    # a fresh interpreter, not a fork of the master; same cwd, so the same app.db and data/jobs
+    server.job_dispatcher = subprocess.Popen([sys.executable, "-c", "import jobs; jobs.serve_forever()"])
+    server.log.info("Job dispatcher started (pid:%s)", server.job_dispatcher.pid)
+
+
+def when_ready(server):
+    # Move everything allocated while preloading into the permanent generation so
+    # the collector never touches (and un-shares) those pages in the workers.
+    gc.collect()
+    gc.freeze()
+    _ensure_dispatcher(server)
+
+
+def on_reload(server):
+    _ensure_dispatcher(server)
+
+
+def pre_fork(server, worker):
+    # the master has no periodic hook; worker (re)starts are the next best place to
+    # notice a dispatcher that died
+    _ensure_dispatcher(server)
+
+
+def post_fork(server, worker):
+    # SQLite connections opened in the master (create_all, schema guard) must not be
+    # reused across processes; drop them from this worker's pool without closing.
+    from db import engine
+    engine.dispose(close=False)
+
+
+def on_exit(server):
+    # the dispatcher stops its pool and re-queues unfinished jobs on SIGTERM
+    dispatcher = getattr(server, "job_dispatcher", None)
+    if dispatcher is not None and dispatcher.poll() is None:
+        dispatcher.terminate()
+        try:
+            dispatcher.wait(timeout=graceful_timeout)
+        except subprocess.TimeoutExpired:
+            dispatcher.kill()
@@ -0,0 +1,643 @@
+"""Background jobs for computations that do not fit in a request.
+
+Jobs are rows in the ``jobs`` table of app.db. One process per host holds
+the dispatcher lock and runs jobs on a process pool sized to the cores:
+under gunicorn a dedicated process started by the master (see
+``serve_forever`` and gunicorn.conf.py), otherwise one of the web workers.
+Web workers only enqueue. Each job runs in a pool process that reports
+progress to the database and spills result chunks to ``data/jobs/<id>/<lease>/``.
+
+Claiming a job gives the run a lease (``lease_id``, ``owner_pid`` and a
+heartbeat refreshed by progress reports). A dispatcher that stops terminates
+its pool processes and re-queues their jobs before releasing the lock; runs
+whose owner died without doing so (e.g. a killed web worker) are re-queued
+once that process is gone or its heartbeat goes stale.
+
+Finished jobs keep their results for ``JOB_RESULT_TTL`` (7 days by default);
+the dispatcher then deletes the chunks and marks the job ``expired``.
+"""
+import json
+import math
+import multiprocessing
+import os
+import random
+import shutil
+import signal
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, every worker dispatches
+    fcntl = None
+
+from sqlalchemy import text
+
+import calculator
+import factors
+import models
+from db import SessionLocal
+
+
+def _available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))  # respects taskset / container cpusets, like gunicorn.conf.py
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+JOBS_DIR = Path(__file__).parent.resolve() / "data" / "jobs"
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "0")) or _available_cpus()
+JOBS_PER_USER = int(os.getenv("JOBS_PER_USER", "2"))  # queued + running
+POLL_INTERVAL = 1.0
+PROGRESS_INTERVAL = 0.5  # min seconds between progress writes from a running job
+# a running job whose progress heartbeat is older than this is considered abandoned
+LEASE_TIMEOUT = int(os.getenv("JOB_LEASE_TIMEOUT", "300"))
+CHUNK_SIZE = 10_000
+# finished jobs are kept this long (seconds), then their chunks are deleted and the job
+# is marked "expired"; 0 keeps them forever
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", str(7 * 24 * 3600)))
+EXPIRE_INTERVAL = 300.0  # seconds between expiry passes of the dispatcher
+
+ACTIVE_STATES = ("queued", "running")
+FINISHED_STATES = ("succeeded", "failed", "cancelled")
+
+# "external": the web workers only enqueue; a separate serve_forever() process dispatches
+EMBEDDED_DISPATCHER = os.getenv("JOB_DISPATCHER", "embedded").lower() != "external"
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# -- tasks -------------------------------------------------------------
+# Each task has a validator (runs at submit, raises ValueError) and a runner
+# (runs in a pool process, returns a small JSON summary).
+
+def _number(params: dict, key: str, default, lo, hi, cast=float):
+    try:
+        value = cast(params.get(key, default))
+    except (TypeError, ValueError):
+        raise ValueError(f"'{key}' must be a number")
+    if not lo <= value <= hi:
+        raise ValueError(f"'{key}' must be between {lo} and {hi}")
+    return value
+
+
+def _seed(params: dict):
+    seed = params.get("seed")
+    # random.Random accepts any hashable seed; keep it to JSON integers (bool is an int subclass)
+    if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool)):
+        raise ValueError("'seed' must be an integer or null")
+    return seed
+
+
+def _emission_inputs(params: dict) -> dict:
+    return {
+        "industry": str(params.get("industry", "") or "").lower(),
+        "production": _number(params, "production", 0, 0, 1e12),
+        "years": _number(params, "years", 1, 0, 100),
+        "energy_source": str(params.get("energy_source", "mixed") or "mixed").lower(),
+    }
+
+
+def validate_monte_carlo(params: dict) -> dict:
+    out = _emission_inputs(params)
+    out["samples"] = _number(params, "samples", 100_000, 1, 1_000_000, int)
+    out["uncertainty"] = _number(params, "uncertainty", 0.1, 0, 1)
+    out["seed"] = _seed(params)
+    return out
+
+
+def run_monte_carlo(params: dict, ctx) -> dict:
+    """Sample emissions under trend and production uncertainty; samples are spilled as chunks."""
+    rng = random.Random(params["seed"])
+    base = calculator.calculate_emission(params["industry"], params["production"], params["years"],
+                                         params["energy_source"], snapshot=ctx.snapshot)
+    n, sigma = params["samples"], params["uncertainty"]
+    total = total_sq = 0.0
+    values = []
+    chunk = []
+    for i in range(n):
+        value = base * rng.uniform(0.95, 1.08) * max(0.0, rng.gauss(1.0, sigma))
+        total += value
+        total_sq += value * value
+        values.append(value)
+        chunk.append(round(value, 4))
+        if len(chunk) == CHUNK_SIZE:
+            ctx.write_chunk(chunk)
+            chunk = []
+            ctx.progress((i + 1) / n)
+    if chunk:
+        ctx.write_chunk(chunk)
+
+    values.sort()
+    mean = total / n
+    return {
+        "base_emissions": base,
+        "samples": n,
+        "mean": mean,
+        "std": math.sqrt(max(0.0, total_sq / n - mean * mean)),
+        "p5": values[int(0.05 * (n - 1))],
+        "p50": values[int(0.50 * (n - 1))],
+        "p95": values[int(0.95 * (n - 1))],
+    }
+
+
+def validate_forecast(params: dict) -> dict:
+    out = _emission_inputs(params)
+    out["months"] = _number(params, "months", 120, 1, 1200, int)
+    out["paths"] = _number(params, "paths", 1000, 1, 100_000, int)
+    out["monthly_growth"] = _number(params, "monthly_growth", 0.0, -0.5, 0.5)
+    out["seed"] = _seed(params)
+    return out
+
+
+def run_forecast(params: dict, ctx) -> dict:
+    """Monthly emission forecast from simulated trend paths; one row per month with a 90% band."""
+    rng = random.Random(params["seed"])
+    monthly = calculator.calculate_emission(params["industry"], params["production"], 1 / 12,
+                                            params["energy_source"], snapshot=ctx.snapshot)
+    months, paths, growth = params["months"], params["paths"], params["monthly_growth"]
+    levels = [monthly] * paths
+    rows = []
+    cumulative = 0.0
+    for m in range(1, months + 1):
+        levels = [lvl * (1 + growth) * rng.uniform(0.97, 1.03) for lvl in levels]
+        ordered = sorted(levels)
+        mean = sum(ordered) / paths
+        cumulative += mean
+        rows.append({
+            "month": m,
+            "emissions": round(mean, 4),
+            "low": round(ordered[int(0.05 * (paths - 1))], 4),
+            "high": round(ordered[int(0.95 * (paths - 1))], 4),
+        })
+        if len(rows) == CHUNK_SIZE:
+            ctx.write_chunk(rows)
+            rows = []
+        ctx.progress(m / months)
+    if rows:
+        ctx.write_chunk(rows)
+    return {"months": months, "paths": paths, "total_emissions": round(cumulative, 4)}
+
+
+def validate_bulk_calculate(params: dict) -> dict:
+    items = params.get("items")
+    if not isinstance(items, list) or not all(isinstance(i, dict) for i in items):
+        raise ValueError("'items' must be a list of objects")
+    if len(items) > 100_000:
+        raise ValueError("At most 100000 items per job")
+    return {"items": [_emission_inputs(i) for i in items]}
+
+
+def run_bulk_calculate(params: dict, ctx) -> dict:
+    """Same calculation as /api/calculate for every item; results are chunked in input order."""
+    items = params["items"]
+    price = ctx.snapshot.credit_price
+    rows = []
+    total = 0.0
+    for i, item in enumerate(items):
+        emissions = calculator.calculate_emission(item["industry"], item["production"], item["years"],
+                                                  item["energy_source"], snapshot=ctx.snapshot)
+        credits = math.ceil(emissions)
+        total += emissions
+        rows.append({**item, "emissions_tons": emissions, "credits_needed": credits,
+                     "credit_cost": round(credits * price, 2)})
+        if len(rows) == CHUNK_SIZE:
+            ctx.write_chunk(rows)
+            rows = []
+            ctx.progress((i + 1) / len(items))
+    if rows:
+        ctx.write_chunk(rows)
+    return {"items": len(items), "total_emissions_tons": total, "credit_price": price}
+
+
+TASKS = {
+    "monte_carlo": (validate_monte_carlo, run_monte_carlo),
+    "forecast": (validate_forecast, run_forecast),
+    "bulk_calculate": (validate_bulk_calculate, run_bulk_calculate),
+}
+
+
+# -- execution (pool process side) -------------------------------------
+# Every write a run makes is conditional on its lease, so a run whose job was
+# re-queued (and possibly claimed again) can never overwrite the new run.
+
+class LeaseLost(Exception):
+    pass
+
+
+def job_dir(job_id: str) -> Path:
+    return JOBS_DIR / job_id
+
+
+def run_dir(job_id: str, lease_id: Optional[str]) -> Path:
+    # one directory per run, so a stale run cannot write into its successor's chunks
+    return job_dir(job_id) / lease_id if lease_id else job_dir(job_id)
+
+
+def chunk_path(job_id: str, lease_id: Optional[str], index: int) -> Path:
+    return run_dir(job_id, lease_id) / f"chunk-{index:05d}.json"
+
+
+def _leased(db, job_id: str, lease_id: str):
+    return db.query(models.Job).filter(models.Job.id == job_id, models.Job.lease_id == lease_id,
+                                       models.Job.state == "running")
+
+
+class JobContext:
+    """Handed to task runners for progress reporting, cancellation checks and result spilling."""
+
+    def __init__(self, job_id: str, lease_id: str):
+        self.job_id = job_id
+        self.lease_id = lease_id
+        self.snapshot = factors.registry.snapshot()
+        self.chunks = 0
+        self._last_report = 0.0
+        run_dir(job_id, lease_id).mkdir(parents=True, exist_ok=True)
+
+    def progress(self, fraction: float):
+        now = time.monotonic()
+        if now - self._last_report < PROGRESS_INTERVAL:
+            return
+        self._last_report = now
+        db = SessionLocal()
+        try:
+            # doubles as the lease heartbeat
+            updated = _leased(db, self.job_id, self.lease_id).update(
+                {"progress": min(1.0, max(0.0, fraction)), "result_chunks": self.chunks,
+                 "heartbeat_at": datetime.utcnow()}, synchronize_session=False)
+            db.commit()
+            if not updated:
+                raise LeaseLost()
+            if db.query(models.Job.cancel_requested).filter(models.Job.id == self.job_id).scalar():
+                raise JobCancelled()
+        finally:
+            db.close()
+
+    def write_chunk(self, rows: list):
+        path = chunk_path(self.job_id, self.lease_id, self.chunks)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(rows, f)
+        os.replace(tmp, path)
+        self.chunks += 1
+
+
+def _finish(job_id: str, lease_id: str, state: str, **fields) -> bool:
+    db = SessionLocal()
+    try:
+        updated = _leased(db, job_id, lease_id).update(
+            {"state": state, "finished_at": datetime.utcnow(), **fields}, synchronize_session=False)
+        db.commit()
+        return bool(updated)
+    finally:
+        db.close()
+
+
+_executing = threading.Event()
+
+
+def _watch_dispatcher(dispatcher_pid: int):
+    """Pool initializer: exit once the dispatcher is gone and no job is executing.
+
+    Idle pool processes would otherwise wait on the call queue forever after their
+    dispatcher was killed; a run in progress finishes first (its lease keeps it safe).
+    """
+    def watch():
+        while os.getppid() == dispatcher_pid or _executing.is_set():
+            time.sleep(POLL_INTERVAL)
+        os._exit(0)
+
+    threading.Thread(target=watch, name="dispatcher-watch", daemon=True).start()
+
+
+def execute_job(job_id: str, lease_id: str):
+    """Entry point inside a pool process."""
+    _executing.set()
+    try:
+        _execute(job_id, lease_id)
+    finally:
+        _executing.clear()
+
+
+def _execute(job_id: str, lease_id: str):
+    db = SessionLocal()
+    try:
+        taken = _leased(db, job_id, lease_id).update(
+            {"owner_pid": os.getpid(), "heartbeat_at": datetime.utcnow()}, synchronize_session=False)
+        db.commit()
+        if not taken:
+            return  # re-queued or cancelled before this process picked it up
+        job = db.get(models.Job, job_id)
+        kind, params = job.kind, json.loads(job.params)
+    finally:
+        db.close()
+
+    ctx = JobContext(job_id, lease_id)
+    try:
+        summary = TASKS[kind][1](params, ctx)
+    except LeaseLost:
+        return  # whoever re-queued the job owns its rows and directories now
+    except JobCancelled:
+        shutil.rmtree(run_dir(job_id, lease_id), ignore_errors=True)
+        _finish(job_id, lease_id, "cancelled", result_chunks=0)
+        return
+    except Exception as e:
+        _finish(job_id, lease_id, "failed", error=f"{type(e).__name__}: {e}", result_chunks=ctx.chunks)
+        return
+    _finish(job_id, lease_id, "succeeded", progress=1.0, result_chunks=ctx.chunks,
+            summary=json.dumps({**summary, "factor_version": ctx.snapshot.version}))
+
+
+# -- submission and lookup (web worker side) ---------------------------
+
+class JobLimitExceeded(Exception):
+    pass
+
+
+_INSERT_WITHIN_LIMIT = text(
+    "INSERT INTO jobs (id, user_id, kind, params, state, progress, cancel_requested, result_chunks, created_at) "
+    "SELECT :id, :user_id, :kind, :params, 'queued', 0.0, 0, 0, CURRENT_TIMESTAMP "
+    "WHERE (SELECT count(*) FROM jobs WHERE user_id = :user_id AND state IN ('queued', 'running')) < :limit"
+)
+
+
+def submit(db, user_id: int, kind: str, params: dict) -> models.Job:
+    if kind not in TASKS:
+        raise ValueError(f"Unknown job type '{kind}'. Available: {', '.join(TASKS)}")
+    params = TASKS[kind][0](params or {})
+    # count and insert in one statement: SQLite runs it under a single write lock, so
+    # concurrent submits from several workers cannot both pass the per-user limit
+    job_id = uuid.uuid4().hex
+    inserted = db.execute(_INSERT_WITHIN_LIMIT, {
+        "id": job_id, "user_id": user_id, "kind": kind, "params": json.dumps(params), "limit": JOBS_PER_USER,
+    }).rowcount
+    db.commit()
+    if not inserted:
+        raise JobLimitExceeded(f"At most {JOBS_PER_USER} active jobs per user")
+    runner.wake()
+    return db.get(models.Job, job_id)
+
+
+def cancel(db, job: models.Job) -> models.Job:
+    """Queued jobs are cancelled at once; running ones stop at their next progress report.
+
+    Both updates are conditional on the row's current state, not on ``job`` (which may
+    be stale), so a job that finished in the meantime is left alone.
+    """
+    updated = db.query(models.Job).filter(models.Job.id == job.id, models.Job.state == "queued").update(
+        {"state": "cancelled", "finished_at": datetime.utcnow()}, synchronize_session=False)
+    if not updated:
+        db.query(models.Job).filter(models.Job.id == job.id, models.Job.state == "running").update(
+            {"cancel_requested": True}, synchronize_session=False)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def describe(job: models.Job) -> dict:
+    return {
+        "job_id": job.id,
+        "type": job.kind,
+        "state": job.state,
+        "progress": round(job.progress or 0.0, 4),
+        "cancel_requested": bool(job.cancel_requested),
+        "result_chunks": job.result_chunks,
+        "summary": json.loads(job.summary) if job.summary else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+# -- dispatcher --------------------------------------------------------
+
+def _pid_alive(pid) -> bool:
+    if not pid:
+        return False
+    if os.name == "nt":
+        return True  # os.kill(pid, 0) would terminate it; rely on the heartbeat
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobRunner:
+    def __init__(self, max_workers: int = JOB_WORKERS, lock_path: Path = JOBS_DIR / ".dispatcher.lock"):
+        self.max_workers = max_workers
+        self.lock_path = lock_path
+        self._lock_file = None
+        self._executor = None
+        self._active = {}  # job id -> lease id of runs submitted by this dispatcher
+        self._guard = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._stopping = False
+        self._next_expiry = 0.0
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        JOBS_DIR.mkdir(parents=True, exist_ok=True)
+        self._stop.clear()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._loop, name="job-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._executor is not None:
+            # Kill our pool processes before giving up the lock: the next dispatcher must
+            # never find one of our runs still executing. The executor has no public way
+            # to stop running calls, hence _processes.
+            self._stopping = True
+            with self._guard:
+                leases = list(self._active.items())
+            processes = list((getattr(self._executor, "_processes", None) or {}).values())
+            for p in processes:
+                p.terminate()
+            for p in processes:
+                p.join(timeout=5)
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._requeue(leases)
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def wake(self):
+        self._wake.set()
+
+    def _try_lead(self) -> bool:
+        if self._lock_file is not None:
+            return True
+        if fcntl is None:
+            self._lock_file = open(os.devnull)
+        else:
+            f = open(self.lock_path, "a")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                return False
+            self._lock_file = f
+        self._executor = self._new_executor()
+        return True
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # spawn, not fork: the web worker has threads and open SQLite connections
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_watch_dispatcher, initargs=(os.getpid(),))
+
+    def _requeue(self, leases):
+        """Put (job id, lease id) runs back in the queue, or mark them cancelled if that was asked for."""
+        released = {"lease_id": None, "owner_pid": None, "heartbeat_at": None}
+        db = SessionLocal()
+        try:
+            for job_id, lease_id in leases:
+                # conditional on the lease, so a run that just finished keeps its result
+                updated = _leased(db, job_id, lease_id).filter(models.Job.cancel_requested.is_(True)).update(
+                    {"state": "cancelled", "finished_at": datetime.utcnow(), **released}, synchronize_session=False)
+                updated += _leased(db, job_id, lease_id).update(
+                    {"state": "queued", "progress": 0.0, "result_chunks": 0, "started_at": None, **released},
+                    synchronize_session=False)
+                db.commit()
+                if updated:
+                    shutil.rmtree(run_dir(job_id, lease_id), ignore_errors=True)
+        finally:
+            db.close()
+
+    def _requeue_orphans(self):
+        # A run outlives its dispatcher when that process was killed (pool processes are
+        # separate processes), so only re-queue runs whose owner is gone or has stopped
+        # reporting progress. Runs of this dispatcher are tracked through their futures.
+        stale_before = datetime.utcnow() - timedelta(seconds=LEASE_TIMEOUT)
+        with self._guard:
+            own = set(self._active.values())
+        db = SessionLocal()
+        try:
+            running = (db.query(models.Job.id, models.Job.lease_id, models.Job.owner_pid, models.Job.heartbeat_at)
+                       .filter(models.Job.state == "running").all())
+        finally:
+            db.close()
+        orphans = [(job_id, lease_id) for job_id, lease_id, pid, heartbeat in running
+                   if lease_id not in own
+                   and (not _pid_alive(pid) or heartbeat is None or heartbeat < stale_before)]
+        if orphans:
+            self._requeue(orphans)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                if self._try_lead():
+                    self._requeue_orphans()
+                    self._dispatch()
+                    self._expire_results()
+            except Exception as e:
+                print("WARN: job dispatcher error:", e)
+            self._wake.wait(POLL_INTERVAL)
+            self._wake.clear()
+
+    def _expire_results(self):
+        """Delete the chunks of jobs finished more than JOB_RESULT_TTL ago and mark them expired."""
+        now = time.monotonic()
+        if not JOB_RESULT_TTL or now < self._next_expiry:
+            return
+        self._next_expiry = now + EXPIRE_INTERVAL
+        cutoff = datetime.utcnow() - timedelta(seconds=JOB_RESULT_TTL)
+        db = SessionLocal()
+        try:
+            expired = (db.query(models.Job.id).filter(models.Job.state.in_(FINISHED_STATES),
+                                                      models.Job.finished_at < cutoff).all())
+            for (job_id,) in expired:
+                # the row is marked first, so the result endpoint answers 410 rather than
+                # finding a half-deleted directory; params can be large (bulk items)
+                updated = db.query(models.Job).filter(models.Job.id == job_id,
+                                                      models.Job.state.in_(FINISHED_STATES)).update(
+                    {"state": "expired", "result_chunks": 0, "params": "{}"}, synchronize_session=False)
+                db.commit()
+                if updated:
+                    shutil.rmtree(job_dir(job_id), ignore_errors=True)
+        finally:
+            db.close()
+
+    def _dispatch(self):
+        with self._guard:
+            free = self.max_workers - len(self._active)
+        if free <= 0:
+            return
+        db = SessionLocal()
+        try:
+            queued = (db.query(models.Job.id).filter(models.Job.state == "queued")
+                      .order_by(models.Job.created_at, models.Job.id).limit(free).all())
+            for (job_id,) in queued:
+                lease_id = uuid.uuid4().hex
+                claimed = db.query(models.Job).filter(models.Job.id == job_id, models.Job.state == "queued").update(
+                    {"state": "running", "started_at": datetime.utcnow(), "lease_id": lease_id,
+                     "owner_pid": os.getpid(), "heartbeat_at": datetime.utcnow()}, synchronize_session=False)
+                db.commit()
+                if claimed:
+                    self._submit(job_id, lease_id)
+        finally:
+            db.close()
+
+    def _submit(self, job_id: str, lease_id: str):
+        with self._guard:
+            self._active[job_id] = lease_id
+        try:
+            future = self._executor.submit(execute_job, job_id, lease_id)
+        except BrokenProcessPool:
+            # a pool process died earlier; start a fresh pool
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._new_executor()
+            future = self._executor.submit(execute_job, job_id, lease_id)
+        future.add_done_callback(lambda f, job_id=job_id, lease_id=lease_id: self._done(job_id, lease_id, f))
+
+    def _done(self, job_id: str, lease_id: str, future):
+        with self._guard:
+            self._active.pop(job_id, None)
+        if self._stopping:
+            return  # stop() terminated the pool and re-queues the run
+        if not future.cancelled() and future.exception() is not None:
+            # the pool process died (e.g. killed by the OOM killer) before recording a result
+            _finish(job_id, lease_id, "failed", error=f"Worker process failed: {future.exception()!r}")
+        self.wake()
+
+
+runner = JobRunner()
+
+
+def serve_forever():
+    """Run the dispatcher in this process until SIGTERM/SIGINT or until its parent exits.
+
+    gunicorn.conf.py starts this from the master, so reloads and recycling of the
+    web workers never interrupt running jobs.
+    """
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+    parent = os.getppid()
+    runner.start()
+    try:
+        while not stop.wait(POLL_INTERVAL) and os.getppid() == parent:
+            pass
+    finally:
+        runner.stop()
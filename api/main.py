@@ -2,17 +2,23 @@ from pathlib import Path
 import time
 import os
 from fastapi import FastAPI, Request, Depends, Form, Body, HTTPException, status
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.responses import JSONResponse, RedirectResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 from passlib.context import CryptContext
 from itsdangerous import URLSafeSerializer
 import uvicorn
-from typing import cast
+from typing import cast, Optional
 import math
+import re
 import calculator  # new module in d:\api\calculator.py
 import random
+from ratelimit import RateLimitMiddleware
+from compression import CompressionMiddleware
+from pagecache import PageCache
+import factors
+import jobs
 
 from db import engine, SessionLocal, Base
 import models
@@ -22,6 +28,7 @@ from schemas import UserCreate, Token, UserOut
 
 BASE_DIR = Path(__file__).parent.resolve()
 SECRET_KEY = "change_this_to_a_random_secret_in_production"
+EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
 
 # simple in-memory user store used by the template-based auth paths (can be left empty or populated at runtime)
 USERS = {}
@@ -32,14 +39,22 @@ serializer = URLSafeSerializer(SECRET_KEY, salt="session")
 
 app = FastAPI()
 templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
+# Compile the page template at import so a preloading server (gunicorn.conf.py) shares it across workers
+templates.get_template("index.html")
+index_page = PageCache(templates, "index.html")
 app.mount("/static", StaticFiles(directory=str(BASE_DIR / "static")), name="static")
 
+# Added before CORS so 429/503 responses still carry CORS headers for the frontend
+app.add_middleware(RateLimitMiddleware)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
+# gzip/brotli for text responses over 1 KB (HTML, JSON, CSS, JS)
+app.add_middleware(CompressionMiddleware)
 
 @app.middleware("http")
 async def add_custom_headers(request: Request, call_next):
     response = await call_next(request)
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+    # keep an explicit policy (e.g. the ETag-validated index page), default to no caching
+    response.headers.setdefault("Cache-Control", "no-cache, no-store, must-revalidate")
     response.headers["Pragma"] = "no-cache"
     response.headers["Expires"] = "0"
     return response
@@ -72,6 +87,13 @@ def _ensure_sqlite_columns():
             # Add created_at if missing
             if "created_at" not in existing:
                 conn.exec_driver_sql("ALTER TABLE users ADD COLUMN created_at DATETIME")
+
+            # Add job lease columns if missing
+            info = conn.exec_driver_sql("PRAGMA table_info(jobs)").fetchall()
+            existing = {row[1] for row in info}
+            for column, ddl in (("lease_id", "TEXT"), ("owner_pid", "INTEGER"), ("heartbeat_at", "DATETIME")):
+                if column not in existing:
+                    conn.exec_driver_sql(f"ALTER TABLE jobs ADD COLUMN {column} {ddl}")
     except Exception as e:
         # Don't crash app if migration fails; just log to console
         print("WARN: SQLite column check/migration failed:", e)
@@ -79,6 +101,17 @@ def _ensure_sqlite_columns():
 # Run schema guard at import time
 _ensure_sqlite_columns()
 
+@app.on_event("startup")
+def start_job_runner():
+    # under gunicorn the dispatcher runs in its own process (JOB_DISPATCHER=external);
+    # otherwise only one worker per host takes the dispatcher lock, the others just enqueue
+    if jobs.EMBEDDED_DISPATCHER:
+        jobs.runner.start()
+
+@app.on_event("shutdown")
+def stop_job_runner():
+    jobs.runner.stop()
+
 def get_user(email: str):
     # return from the in-memory USERS mapping (used by the template-based login flow)
     return USERS.get(email)
@@ -107,12 +140,13 @@ async def get_current_user(request: Request):
 
 @app.get("/")
 async def index(request: Request, current_user=Depends(get_current_user)):
-    # pass current_user into the template so you can show user info
-    return templates.TemplateResponse(
-        "index.html",
+    # The page is a pre-rendered shell per variant (anonymous / logged in), so it must not
+    # contain per-user data: "user" is only a flag here, details come from /api/me.
+    return index_page.response(
+        request,
+        "user" if current_user else "anonymous",
         {
-            "request": request,
-            "user": current_user,
+            "user": True if current_user else None,
             "cache_bust": app.state.asset_version,
             "bypass_login": app.state.bypass_login,
             "backend_url": app.state.backend_url
@@ -339,10 +373,11 @@ def api_calculate(payload: dict = Body(...)):
         years = 1.0
     energy_source = payload.get("energy_source", "mixed") or "mixed"
 
-    emissions_tons = calculator.calculate_emission(industry, production, years, energy_source)
+    snap = factors.registry.snapshot()
+    emissions_tons = calculator.calculate_emission(industry, production, years, energy_source, snapshot=snap)
     credits_needed = math.ceil(emissions_tons)
-    # Replace with real price source if available; fallback to 6.97
-    credit_price = getattr(app.state, "credit_price", None) or 6.97
+    # Replace with real price source if available; fallback to the registry default credit price
+    credit_price = getattr(app.state, "credit_price", None) or snap.credit_price
     credit_cost = round(credits_needed * float(credit_price), 2)
 
     return {
@@ -353,7 +388,8 @@ def api_calculate(payload: dict = Body(...)):
         "emissions_tons": emissions_tons,
         "credits_needed": credits_needed,
         "credit_price": credit_price,
-        "credit_cost": credit_cost
+        "credit_cost": credit_cost,
+        "factor_version": snap.version
     }
 
 @app.get("/api/admin/users")
@@ -377,8 +413,7 @@ def admin_create_user(payload: dict = Body(...), db: Session = Depends(auth.get_
     name = payload.get("name", "").strip()
 
     # email format validation
-    import re
-    if not email or not re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', email):
+    if not email or not EMAIL_RE.match(email):
         raise HTTPException(status_code=400, detail="Valid email address is required")
     
     if not password or len(password) < 6:
@@ -432,7 +467,8 @@ def ai_predict(payload: dict = Body(...)):
     energy_source = payload.get("energy_source", "mixed").lower()
     
     # Base calculation using your calculator.py
-    base_emissions = calculator.calculate_emission(industry, production, years, energy_source)
+    snap = factors.registry.snapshot()
+    base_emissions = calculator.calculate_emission(industry, production, years, energy_source, snapshot=snap)
     
     # AI-enhanced predictions (simulated with realistic variations)
     confidence = random.uniform(0.75, 0.95)
@@ -450,7 +486,7 @@ def ai_predict(payload: dict = Body(...)):
         trend = "stable"
     
     # Generate AI recommendations based on industry and energy source
-    recommendations = generate_ai_recommendations(industry, energy_source, trend_factor)
+    recommendations = generate_ai_recommendations(industry, energy_source, trend_factor, snapshot=snap)
     
     return {
         "current_emissions": base_emissions,
@@ -459,95 +495,44 @@ def ai_predict(payload: dict = Body(...)):
         "trend": trend,
         "recommendations": recommendations,
         "industry": industry,
-        "energy_source": energy_source
+        "energy_source": energy_source,
+        "factor_version": snap.version
     }
 
-def generate_ai_recommendations(industry: str, energy_source: str, trend_factor: float):
-    """Generate context-aware recommendations"""
-    recommendations = []
-    
-    # Energy-based recommendations
-    if energy_source in ["coal", "oil"]:
-        recommendations.append("Switch to renewable energy sources to reduce emissions by 70-90%")
-        recommendations.append("Consider hybrid energy systems as an intermediate step")
-    elif energy_source == "natural_gas":
-        recommendations.append("Upgrade to renewable energy for maximum emission reduction")
-    elif energy_source == "mixed":
-        recommendations.append("Optimize energy mix by increasing renewable percentage")
-    
-    # Industry-specific recommendations
-    industry_tips = {
-        "steel": ["Implement electric arc furnace technology", "Use recycled steel to reduce emissions"],
-        "cement": ["Adopt carbon capture and storage (CCS)", "Use alternative fuels in kilns"],
-        "textile": ["Implement water recycling systems", "Switch to organic/sustainable materials"],
-        "chemical": ["Optimize reaction processes", "Implement heat recovery systems"],
-        "other": ["Conduct energy audit", "Implement lean manufacturing processes"]
-    }
-    
-    if industry in industry_tips:
-        recommendations.extend(industry_tips[industry])
-    
-    # Trend-based recommendations
-    if trend_factor > 1.05:
-        recommendations.append(" Emissions trending upward - immediate action recommended")
-        recommendations.append("Review and optimize current processes")
-    elif trend_factor < 0.95:
-        recommendations.append("Good progress - maintain current efficiency measures")
-    
-    return recommendations[:5]  # Return top 5 recommendations
+def generate_ai_recommendations(industry: str, energy_source: str, trend_factor: float, snapshot=None):
+    """Generate context-aware recommendations (top 5, precomputed in the recommendation index)"""
+    snap = snapshot or factors.registry.snapshot()
+    return snap.recommender.industry(industry, energy_source, trend_factor)
 
 @app.get("/api/packaging-materials")
 def get_packaging_materials():
-    """Return detailed packaging materials data including plastic subtypes"""
+    """Return detailed packaging materials data including plastic subtypes (from data/emission_factors.json)"""
+    snap = factors.registry.snapshot()
+    return {**snap.materials_catalog, "factor_version": snap.version}
+
+@app.get("/api/emission-factors")
+def get_emission_factors():
+    """Return the industry, energy source and transport factors of the current registry version"""
+    snap = factors.registry.snapshot()
     return {
-        "plastics": {
-            "PET": {"emission_factor": 3.4, "recycled_factor": 1.5, "description": "Polyethylene Terephthalate - bottles, containers"},
-            "HDPE": {"emission_factor": 1.9, "recycled_factor": 0.7, "description": "High-Density Polyethylene - milk jugs, detergent bottles"},
-            "LDPE": {"emission_factor": 1.8, "recycled_factor": 0.65, "description": "Low-Density Polyethylene - plastic bags, films"},
-            "PP": {"emission_factor": 1.95, "recycled_factor": 0.8, "description": "Polypropylene - yogurt containers, caps"},
-            "PS": {"emission_factor": 3.1, "recycled_factor": 1.2, "description": "Polystyrene - disposable cups, food containers"},
-            "PVC": {"emission_factor": 2.4, "recycled_factor": 1.0, "description": "Polyvinyl Chloride - pipes, packaging films"},
-            "Bioplastics": {"emission_factor": 2.1, "recycled_factor": 0.9, "description": "Plant-based plastic alternatives"}
-        },
-        "paper": {
-            "Virgin_Cardboard": {"emission_factor": 0.91, "recycled_factor": 0.73, "description": "New corrugated cardboard"},
-            "Recycled_Cardboard": {"emission_factor": 0.73, "recycled_factor": 0.55, "description": "Recycled corrugated cardboard"},
-            "Virgin_Paper": {"emission_factor": 1.32, "recycled_factor": 0.95, "description": "Virgin paper packaging"},
-            "Recycled_Paper": {"emission_factor": 0.95, "recycled_factor": 0.75, "description": "Recycled paper packaging"}
-        },
-        "glass": {
-            "Clear_Glass": {"emission_factor": 0.85, "recycled_factor": 0.36, "description": "Clear glass containers"},
-            "Brown_Glass": {"emission_factor": 0.88, "recycled_factor": 0.37, "description": "Brown glass containers"},
-            "Green_Glass": {"emission_factor": 0.87, "recycled_factor": 0.37, "description": "Green glass containers"}
-        },
-        "metals": {
-            "Primary_Aluminum": {"emission_factor": 9.12, "recycled_factor": 0.46, "description": "Virgin aluminum cans and foil"},
-            "Recycled_Aluminum": {"emission_factor": 0.46, "recycled_factor": 0.46, "description": "Recycled aluminum packaging"},
-            "Steel": {"emission_factor": 1.85, "recycled_factor": 0.36, "description": "Steel cans and containers"}
-        },
-        "fuels": {
-            "Natural_Gas": {"emission_factor": 0.202, "recycled_factor": 0.202, "description": "Natural gas - kg CO₂e per kWh", "unit": "kWh"},
-            "Diesel": {"emission_factor": 2.678, "recycled_factor": 2.678, "description": "Diesel fuel - kg CO₂e per liter", "unit": "liter"},
-            "Gasoline": {"emission_factor": 2.31, "recycled_factor": 2.31, "description": "Gasoline/petrol - kg CO₂e per liter", "unit": "liter"},
-            "Coal": {"emission_factor": 2.23, "recycled_factor": 2.23, "description": "Coal - kg CO₂e per kg", "unit": "kg"},
-            "LPG": {"emission_factor": 1.51, "recycled_factor": 1.51, "description": "Liquid Petroleum Gas - kg CO₂e per kg", "unit": "kg"}
-        },
-        "transportation": {
-            "Passenger_Car_Petrol": {"emission_factor": 0.171, "recycled_factor": 0.171, "description": "Petrol car - kg CO₂e per km", "unit": "km"},
-            "Passenger_Car_Diesel": {"emission_factor": 0.168, "recycled_factor": 0.168, "description": "Diesel car - kg CO₂e per km", "unit": "km"},
-            "Bus": {"emission_factor": 0.089, "recycled_factor": 0.089, "description": "Bus transport - kg CO₂e per km", "unit": "km"},
-            "Train": {"emission_factor": 0.041, "recycled_factor": 0.041, "description": "Train transport - kg CO₂e per km", "unit": "km"},
-            "Domestic_Flight": {"emission_factor": 0.255, "recycled_factor": 0.255, "description": "Domestic flight - kg CO₂e per km", "unit": "km"},
-            "International_Flight": {"emission_factor": 0.195, "recycled_factor": 0.195, "description": "International flight - kg CO₂e per km", "unit": "km"}
-        },
-        "waste": {
-            "Landfill": {"emission_factor": 0.525, "recycled_factor": 0.525, "description": "Landfill waste - kg CO₂e per kg", "unit": "kg"},
-            "Recycling": {"emission_factor": 0.021, "recycled_factor": 0.021, "description": "Recycled waste - kg CO₂e per kg", "unit": "kg"},
-            "Incineration": {"emission_factor": 0.025, "recycled_factor": 0.025, "description": "Incinerated waste - kg CO₂e per kg", "unit": "kg"}
-        },
-        "carbon_credit_price": 6.5
+        "factor_version": snap.version,
+        "industries": snap.industries.as_dict(),
+        "energy_sources": snap.energy_sources.as_dict(),
+        "transport_modes": snap.transport.as_dict(),
+        "industry_reference": snap.industry_reference
     }
 
+@app.post("/api/admin/factors/reload")
+def admin_reload_factors(current_user = Depends(auth.get_current_user)):
+    """Admin-only: reload emission factors and recommendation rules from disk without a restart"""
+    if not current_user or getattr(current_user, "role", None) != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required")
+    previous = factors.registry.version
+    snap = factors.registry.reload()
+    return {"previous_version": previous, "factor_version": snap.version}
+
+MAX_RECOMMENDATION_BATCH = 1000
+
 @app.post("/api/calculate-packaging")
 def calculate_packaging_emissions(payload: dict = Body(...)):
     """Calculate emissions for packaging materials"""
@@ -561,28 +546,17 @@ def calculate_packaging_emissions(payload: dict = Body(...)):
     transport_mode = payload.get("transport_mode", "truck").lower()
     unit = payload.get("unit", "kg")
     
-    # Get materials data
-    materials = get_packaging_materials()
+    # One registry snapshot for the whole calculation
+    snap = factors.registry.snapshot()
     
     # Get emission factor
-    emission_factor = 0
-    if material_type in materials and material_subtype in materials[material_type]:
-        if is_recycled and material_type not in ["fuels", "transportation", "waste"]:
-            emission_factor = materials[material_type][material_subtype]["recycled_factor"]
-        else:
-            emission_factor = materials[material_type][material_subtype]["emission_factor"]
+    emission_factor = snap.material_factor(material_type, material_subtype, is_recycled)
     
     # Calculate base emissions
     base_emissions = amount * emission_factor
     
     # Transport emissions (simplified calculation)
-    transport_factors = {
-        "truck": 0.12, 
-        "ship": 0.014, 
-        "air": 0.5, 
-        "rail": 0.04
-    }
-    transport_factor = transport_factors.get(transport_mode, 0.1)
+    transport_factor = snap.transport_factor(transport_mode)
     transport_emissions = amount * transport_factor * transport_distance / 1000 if transport_distance > 0 else 0
     
     # Total emissions
@@ -592,73 +566,13 @@ def calculate_packaging_emissions(payload: dict = Body(...)):
     credits_needed = max(1, math.ceil(total_emissions / 1000))
     
     # Calculate cost
-    credit_price = materials.get("carbon_credit_price", 6.5)
+    credit_price = snap.packaging_credit_price
     credit_cost = credits_needed * credit_price
     
-    # Generate appropriate recommendations based on material type
-    recommendations = []
-    
-    if material_type == "plastics":
-        if not is_recycled:
-            recycled_emissions = amount * materials[material_type][material_subtype]["recycled_factor"]
-            savings = base_emissions - recycled_emissions
-            recommendations.append(f"Switch to recycled {material_subtype} to save {round(savings, 2)} kg CO₂e")
-        recommendations.append("Consider lighter packaging design to reduce material usage")
-        recommendations.append("Implement a packaging return program for reuse")
-    
-    elif material_type == "fuels":
-        if material_subtype in ["Natural_Gas", "Diesel", "Gasoline", "Coal"]:
-            recommendations.append("Consider renewable energy alternatives")
-            recommendations.append("Improve energy efficiency to reduce consumption")
-            if material_subtype == "Coal":
-                recommendations.append("Switch to cleaner fuels like natural gas for a 60% emission reduction")
-            elif material_subtype in ["Diesel", "Gasoline"]:
-                recommendations.append("Consider electric vehicles to reduce fuel emissions")
-    
-    elif material_type == "transportation":
-        if material_subtype in ["Passenger_Car_Petrol", "Passenger_Car_Diesel"]:
-            recommendations.append("Consider carpooling to reduce per-person emissions")
-            recommendations.append("Use public transportation when possible")
-        elif material_subtype in ["Domestic_Flight", "International_Flight"]:
-            train_emission = 0.041 * amount  # Using the train emission factor
-            flight_saving = base_emissions - train_emission
-            recommendations.append(f"Consider train travel instead to save {round(flight_saving, 2)} kg CO₂e")
-        recommendations.append("Optimize route planning to minimize distance traveled")
-    
-    elif material_type == "waste":
-        if material_subtype == "Landfill":
-            recycle_emission = materials["waste"]["Recycling"]["emission_factor"] * amount
-            waste_saving = base_emissions - recycle_emission
-            recommendations.append(f"Switch to recycling to save {round(waste_saving, 2)} kg CO₂e")
-            recommendations.append("Implement waste reduction strategies")
-        recommendations.append("Consider composting for organic waste")
-    
-    else:
-        # General recommendations for other material types
-        if transport_mode == "air":
-            ship_emissions = amount * 0.014 * transport_distance / 1000
-            savings = transport_emissions - ship_emissions
-            recommendations.append(f"Switch from air to sea freight to save {round(savings, 2)} kg CO₂e")
-    
-        # Find alternative with lower emissions in same category
-        if material_type in materials:
-            current = emission_factor
-            alternatives = []
-            for subtype, data in materials[material_type].items():
-                if subtype != material_subtype:
-                    factor = data["recycled_factor"] if is_recycled else data["emission_factor"]
-                    if factor < current:
-                        alternatives.append((subtype, factor, data["description"]))
-            
-            if alternatives:
-                best = min(alternatives, key=lambda x: x[1])
-                potential_savings = amount * (current - best[1])
-                recommendations.append(f"Consider {best[0].replace('_', ' ')} ({best[2].split(' - ')[0]}) to save {round(potential_savings, 2)} kg CO₂e")
-    
-    # Add more recommendations if we don't have enough
-    if len(recommendations) < 3:
-        recommendations.append("Consider carbon offsetting programs for unavoidable emissions")
-        recommendations.append("Track and report emissions to identify future reduction opportunities")
+    # Recommendations are precomputed per (material, recycled, transport mode)
+    recommendations = snap.recommender.packaging(
+        material_type, material_subtype, is_recycled, transport_mode, amount, transport_distance
+    )
     
     return {
         "material_type": material_type,
@@ -676,8 +590,92 @@ def calculate_packaging_emissions(payload: dict = Body(...)):
         "credits_needed": credits_needed,
         "credit_price": credit_price,
         "credit_cost": round(credit_cost, 2),
-        "recommendations": recommendations[:3]  # Top 3 recommendations
+        "recommendations": recommendations,  # Top 3 recommendations
+        "factor_version": snap.version
     }
 
+@app.post("/api/recommendations/batch")
+def recommendations_batch(payload: dict = Body(...)):
+    """
+    Expects JSON: {"items": [...]} where each item is either a packaging payload
+    (material_type, material_subtype, amount, is_recycled, transport_mode, transport_distance)
+    or an industry payload (industry, energy_source, trend_factor).
+    Returns one recommendation list per item, in order.
+    """
+    items = payload.get("items")
+    if not isinstance(items, list) or not all(isinstance(i, dict) for i in items):
+        raise HTTPException(status_code=400, detail="'items' must be a list of objects")
+    if len(items) > MAX_RECOMMENDATION_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_RECOMMENDATION_BATCH} items per batch")
+    snap = factors.registry.snapshot()
+    try:
+        results = snap.recommender.batch(items)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"recommendations": results, "factor_version": snap.version}
+
+def _get_own_job(job_id: str, db: Session, current_user):
+    job = db.get(models.Job, job_id)
+    if not job or (job.user_id != current_user.id and getattr(current_user, "role", None) != "admin"):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/api/jobs", status_code=202)
+def submit_job(payload: dict = Body(...), db: Session = Depends(auth.get_db), current_user = Depends(auth.get_current_user)):
+    """
+    Expects JSON: {"type": "monte_carlo" | "forecast" | "bulk_calculate", "params": {...}}
+    Queues the job for the background process pool and returns its id; poll GET /api/jobs/{job_id}.
+    """
+    params = payload.get("params") or {}
+    if not isinstance(params, dict):
+        raise HTTPException(status_code=400, detail="'params' must be an object")
+    try:
+        job = jobs.submit(db, current_user.id, payload.get("type") or "", params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except jobs.JobLimitExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return jobs.describe(job)
+
+@app.get("/api/jobs")
+def list_jobs(db: Session = Depends(auth.get_db), current_user = Depends(auth.get_current_user)):
+    """List the current user's 50 most recent jobs"""
+    rows = (db.query(models.Job).filter(models.Job.user_id == current_user.id)
+            .order_by(models.Job.created_at.desc()).limit(50).all())
+    return [jobs.describe(j) for j in rows]
+
+@app.get("/api/jobs/{job_id}")
+def job_status(job_id: str, db: Session = Depends(auth.get_db), current_user = Depends(auth.get_current_user)):
+    return jobs.describe(_get_own_job(job_id, db, current_user))
+
+@app.get("/api/jobs/{job_id}/result")
+def job_result(job_id: str, chunk: Optional[int] = None, db: Session = Depends(auth.get_db), current_user = Depends(auth.get_current_user)):
+    """Without ?chunk returns the summary and chunk count; with ?chunk=N streams that chunk from disk"""
+    job = _get_own_job(job_id, db, current_user)
+    if job.state == "expired":
+        raise HTTPException(status_code=410, detail="Job results have expired")
+    if job.state != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job.state}")
+    if chunk is None:
+        return jobs.describe(job)
+    if not 0 <= chunk < job.result_chunks:
+        raise HTTPException(status_code=404, detail="Chunk not found")
+    path = jobs.chunk_path(job.id, job.lease_id, chunk)
+    if not path.is_file():
+        # expired after the row was read
+        raise HTTPException(status_code=410, detail="Job results have expired")
+    return FileResponse(path, media_type="application/json")
+
+@app.post("/api/jobs/{job_id}/cancel")
+def cancel_job(job_id: str, db: Session = Depends(auth.get_db), current_user = Depends(auth.get_current_user)):
+    job = _get_own_job(job_id, db, current_user)
+    if job.state not in jobs.ACTIVE_STATES:
+        raise HTTPException(status_code=409, detail=f"Job is already {job.state}")
+    job = jobs.cancel(db, job)
+    if job.state != "cancelled" and not job.cancel_requested:
+        # finished between the check above and the cancel
+        raise HTTPException(status_code=409, detail=f"Job is already {job.state}")
+    return jobs.describe(job)
+
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=8000)
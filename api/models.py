@@ -1,6 +1,6 @@
 from db import Base
 
-from sqlalchemy import Column, Integer, String, DateTime, func
+from sqlalchemy import Column, Integer, String, DateTime, Float, Boolean, Text, func
 
 class User(Base):
     __tablename__ = "users"
@@ -10,4 +10,24 @@ class User(Base):
     name = Column(String, nullable=True)
     role = Column(String, nullable=True)
     theme_preference = Column(String, nullable=True, server_default="dark")  # dark or light
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class Job(Base):
+    __tablename__ = "jobs"
+    id = Column(String, primary_key=True)  # uuid4 hex
+    user_id = Column(Integer, index=True, nullable=False)
+    kind = Column(String, nullable=False)
+    params = Column(Text, nullable=False)  # JSON
+    state = Column(String, index=True, nullable=False, default="queued")  # queued, running, succeeded, failed, cancelled, expired
+    progress = Column(Float, nullable=False, default=0.0)  # 0..1
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    result_chunks = Column(Integer, nullable=False, default=0)  # JSON chunk files under data/jobs/<id>/<lease_id>/
+    summary = Column(Text, nullable=True)  # small JSON result kept inline
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    # lease on a run: set when a dispatcher claims the job, owner_pid is the process executing it
+    lease_id = Column(String, nullable=True)
+    owner_pid = Column(Integer, nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
\ No newline at end of file
@@ -0,0 +1,71 @@
+"""Pre-rendered template pages with ETags.
+
+A page is rendered once per (variant, context) and kept together with its
+gzip/brotli encodings, so serving it is a dict lookup. Entries are dropped
+when the template file changes on disk; context values such as the asset
+version are part of the key, so bumping them renders a fresh copy.
+
+Only render shells this way: the cached bytes are shared by every client
+of a variant and must not contain per-user data.
+"""
+import hashlib
+import os
+
+from fastapi.responses import Response
+
+import compression
+
+
+class _Entry:
+    __slots__ = ("body", "etag", "encoded")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()[:20]
+        self.encoded = {}  # encoding -> (bytes, etag), filled on first request for that encoding
+
+
+class PageCache:
+    def __init__(self, templates, name: str):
+        self.templates = templates
+        self.name = name
+        self.path = os.path.join(templates.env.loader.searchpath[0], name)
+        self._mtime = None
+        self._entries = {}
+
+    def _template_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _entry(self, request, variant, context: dict) -> _Entry:
+        mtime = self._template_mtime()
+        if mtime != self._mtime:
+            self._entries = {}
+            self._mtime = mtime
+        key = (variant, tuple(sorted(context.items())))
+        entry = self._entries.get(key)
+        if entry is None:
+            html = self.templates.get_template(self.name).render({**context, "request": request})
+            entry = self._entries[key] = _Entry(html.encode("utf-8"))
+        return entry
+
+    def response(self, request, variant, context: dict) -> Response:
+        """Cached page for ``variant``; 304 when If-None-Match matches."""
+        entry = self._entry(request, variant, context)
+        encoding = compression.choose_encoding(request.headers.get("accept-encoding", ""))
+        body, etag = entry.body, entry.etag
+        if encoding is not None:
+            encoded = entry.encoded.get(encoding)
+            if encoded is None:
+                encoded = entry.encoded[encoding] = (
+                    compression.compress(entry.body, encoding, best=True), f"{entry.etag}-{encoding}")
+            body, etag = encoded
+
+        headers = {"ETag": f'"{etag}"', "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+        if entry.etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="text/html", headers=headers)
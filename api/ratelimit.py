@@ -0,0 +1,177 @@
+"""In-process rate limiting and load shedding.
+
+Token buckets are kept per (route, identity) in a plain dict so each request
+costs a single lookup and a few float operations. Identity is the JWT ``sub``
+when a valid bearer token is presented, otherwise the client IP; the
+login/signup routes always use the client IP.
+
+Limits are per worker process; with ``--workers=N`` the effective budget is N
+times the configured one.
+"""
+import json
+import os
+import time
+from functools import lru_cache
+from typing import Optional
+
+from jose import jwt, JWTError
+
+import auth
+
+# route path -> (burst capacity, refill rate in tokens/second)
+ROUTE_LIMITS = {
+    "/api/login": (5, 0.2),            # ~12/min after the burst: pbkdf2 is CPU-bound
+    "/api/signup": (5, 0.1),
+    "/api/reset-password": (5, 0.1),
+    "/api/register": (5, 0.1),
+    "/api/calculate": (30, 10.0),
+    "/api/calculate-packaging": (30, 10.0),
+    "/api/ai-predict": (20, 5.0),
+}
+# pre-auth routes are budgeted per client IP only: a bearer token (any account, expiry
+# unchecked) must not buy a fresh login/signup burst
+IP_ONLY_ROUTES = frozenset({"/api/login", "/api/signup", "/api/reset-password", "/api/register"})
+# applied to every other /api/ route; pages and static files are not limited
+DEFAULT_LIMIT = (120, 60.0)
+# bucket route key shared by every /api/ path not in ROUTE_LIMITS, so per-id paths
+# (/api/jobs/<id>, /api/admin/users/<id>, unknown URLs) cannot mint fresh buckets
+DEFAULT_ROUTE = "/api/*"
+
+# global in-flight ceiling per process before new requests are shed with 503
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "64"))
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1").lower() in ("1", "true", "yes", "on")
+
+SWEEP_INTERVAL = 60.0      # seconds between eviction passes
+MAX_BUCKETS = 100_000      # hard cap on tracked (route, identity) pairs
+
+
+class TokenBucketStore:
+    """Token buckets keyed by (route, identity), stored as [tokens, last_seen]."""
+
+    def __init__(self, sweep_interval: float = SWEEP_INTERVAL, max_buckets: int = MAX_BUCKETS):
+        self.buckets = {}
+        self.sweep_interval = sweep_interval
+        self.max_buckets = max_buckets
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def acquire(self, key, capacity: float, rate: float, now: Optional[float] = None) -> float:
+        """Take one token. Returns 0.0 on success, else seconds until a token is available."""
+        if now is None:
+            now = time.monotonic()
+        if now >= self._next_sweep or len(self.buckets) >= self.max_buckets:
+            self.sweep(now)
+
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            self.buckets[key] = [capacity - 1.0, now]
+            return 0.0
+
+        tokens = bucket[0] + (now - bucket[1]) * rate
+        if tokens > capacity:
+            tokens = capacity
+        bucket[1] = now
+        if tokens >= 1.0:
+            bucket[0] = tokens - 1.0
+            return 0.0
+        bucket[0] = tokens
+        return (1.0 - tokens) / rate
+
+    def sweep(self, now: float):
+        """Drop buckets that have refilled completely; they are equivalent to new ones."""
+        self._next_sweep = now + self.sweep_interval
+        stale = []
+        for key, bucket in self.buckets.items():
+            capacity, rate = _limits_for(key[0])
+            if bucket[0] + (now - bucket[1]) * rate >= capacity:
+                stale.append(key)
+        for key in stale:
+            del self.buckets[key]
+
+        # still over the cap (e.g. a flood of distinct IPs): drop the oldest entries
+        if len(self.buckets) > self.max_buckets * 3 // 4:
+            overflow = len(self.buckets) - self.max_buckets // 2
+            for key in list(self.buckets)[:overflow]:
+                del self.buckets[key]
+
+
+def _route_key(path: str) -> str:
+    return path if path in ROUTE_LIMITS else DEFAULT_ROUTE
+
+
+def _limits_for(route: str):
+    return ROUTE_LIMITS.get(route, DEFAULT_LIMIT)
+
+
+@lru_cache(maxsize=4096)
+def _subject_for_token(token: str) -> Optional[str]:
+    # Only used to pick a budget, so a cached sub for a since-expired token is fine.
+    try:
+        payload = jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM],
+                             options={"verify_exp": False})
+    except JWTError:
+        return None
+    return payload.get("sub")
+
+
+def client_identity(scope, use_token: bool = True) -> str:
+    """JWT subject for authenticated requests, client IP otherwise (or always, without ``use_token``)."""
+    for name, value in scope.get("headers", ()) if use_token else ():
+        if name == b"authorization":
+            if value[:7].lower() == b"bearer ":
+                sub = _subject_for_token(value[7:].decode("latin-1").strip())
+                if sub:
+                    return "sub:" + sub
+            break
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+async def _reject(send, status_code: int, detail: str, retry_after: float):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, int(retry_after + 0.999))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class RateLimitMiddleware:
+    """Pure ASGI middleware: sheds load with 503 and enforces per-route budgets with 429."""
+
+    def __init__(self, app, store: Optional[TokenBucketStore] = None,
+                 max_concurrent: int = MAX_CONCURRENT_REQUESTS, enabled: bool = RATE_LIMIT_ENABLED):
+        self.app = app
+        self.store = store or TokenBucketStore()
+        self.max_concurrent = max_concurrent
+        self.enabled = enabled
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self.in_flight >= self.max_concurrent:
+            await _reject(send, 503, "Server busy, please retry shortly", 1)
+            return
+
+        path = scope["path"]
+        if path.startswith("/api/"):
+            route = _route_key(path)
+            capacity, rate = _limits_for(route)
+            identity = client_identity(scope, use_token=route not in IP_ONLY_ROUTES)
+            wait = self.store.acquire((route, identity), capacity, rate)
+            if wait:
+                await _reject(send, 429, "Too many requests", wait)
+                return
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
@@ -0,0 +1,235 @@
+"""Precomputed recommendation index.
+
+Rules live in ``data/recommendation_rules.json``. At startup every rule is
+resolved against the material and transport factor tables for each
+(category, subtype, recycled, transport_mode) combination, so serving a
+request is a dict lookup plus a couple of multiplications per savings figure.
+"""
+import json
+from pathlib import Path
+from typing import Optional
+
+RULES_PATH = Path(__file__).parent.resolve() / "data" / "recommendation_rules.json"
+
+TREND_BUCKETS = ("up", "down", None)
+
+
+def load_rules(path: Path = RULES_PATH) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _matches(rule: dict, field: str, value) -> bool:
+    allowed = rule.get(field)
+    return allowed is None or value in allowed
+
+
+class RecommendationIndex:
+    def __init__(self, materials: dict, transport_factors: dict, non_recyclable=(),
+                 default_transport_factor: float = 0.1, rules: Optional[dict] = None):
+        rules = rules if rules is not None else load_rules()
+        # only dict-valued entries are material categories ("carbon_credit_price" is a scalar)
+        self.materials = {k: v for k, v in materials.items() if isinstance(v, dict)}
+        self.transport_factors = dict(transport_factors)
+        self.non_recyclable = frozenset(non_recyclable)
+        self.default_transport_factor = default_transport_factor
+
+        self._ranked = {}
+        self._packaging = {}
+        self._industry = {}
+        self._build_packaging(rules["packaging"])
+        self._build_industry(rules["industry"])
+
+    # -- packaging -------------------------------------------------------
+
+    def effective_factor(self, category: str, subtype: str, recycled: bool) -> float:
+        data = self.materials[category][subtype]
+        if recycled and category not in self.non_recyclable:
+            return data["recycled_factor"]
+        return data["emission_factor"]
+
+    def _ranked_alternatives(self, category: str, recycled: bool):
+        key = (category, recycled)
+        ranked = self._ranked.get(key)
+        if ranked is None:
+            # sorted() is stable, so ties keep catalog order like the original min() scan
+            ranked = sorted(
+                ((self.effective_factor(category, s, recycled), s) for s in self.materials[category]),
+                key=lambda item: item[0],
+            )
+            self._ranked[key] = ranked
+        return ranked
+
+    def _compile_savings(self, spec: dict, category, subtype, recycled, mode, fields: dict):
+        """Return the (current, target) factor pair for ``spec`` or None when the rule does not apply."""
+        target = spec["target"]
+        if spec["basis"] == "transport":
+            current = self.transport_factors.get(mode, self.default_transport_factor)
+            return current, self.transport_factors[target["transport_mode"]]
+
+        if category is None or subtype is None:
+            return None
+        current = self.effective_factor(category, subtype, recycled)
+        if "factor" in target:
+            return current, self.materials[category][subtype][target["factor"]]
+        if "subtype" in target:
+            return current, self.effective_factor(target["category"], target["subtype"], recycled)
+        if target.get("cheapest_in_category"):
+            for factor, alt in self._ranked_alternatives(category, recycled):
+                if factor >= current:
+                    return None
+                if alt != subtype:
+                    description = self.materials[category][alt]["description"]
+                    fields["alternative"] = alt.replace("_", " ")
+                    fields["alternative_label"] = description.split(" - ")[0]
+                    # pre-subtracted: the catalog scan always reported amount * (current - best)
+                    return current - factor, 0.0
+            return None
+        raise ValueError(f"Unknown savings target: {target}")
+
+    def _compile_packaging(self, config: dict, category, subtype, recycled, mode):
+        entries = []
+        for rule in config["rules"]:
+            if "categories" in rule and category not in rule["categories"]:
+                continue
+            if category in rule.get("exclude_categories", ()):
+                continue
+            if not _matches(rule, "subtypes", subtype) or not _matches(rule, "transport_modes", mode):
+                continue
+            if "recycled" in rule and rule["recycled"] != recycled:
+                continue
+            if len(entries) >= rule.get("when_fewer_than", float("inf")):
+                continue
+
+            fields = {"subtype": subtype, "savings": "{savings}"}
+            factors, basis = None, None
+            if "savings" in rule:
+                factors = self._compile_savings(rule["savings"], category, subtype, recycled, mode, fields)
+                if factors is None:
+                    continue
+                basis = rule["savings"]["basis"]
+            entries.append((rule["text"].format(**fields), factors, basis))
+        return tuple(entries[:config["limit"]])
+
+    def _build_packaging(self, config: dict):
+        modes = list(self.transport_factors) + [None]
+        combos = [(None, None)]
+        for category, subtypes in self.materials.items():
+            combos.append((category, None))
+            combos.extend((category, s) for s in subtypes)
+        for category, subtype in combos:
+            for recycled in (False, True):
+                for mode in modes:
+                    self._packaging[(category, subtype, recycled, mode)] = \
+                        self._compile_packaging(config, category, subtype, recycled, mode)
+
+    def packaging(self, category: str, subtype: str, is_recycled, transport_mode: str,
+                  amount: float, transport_distance: float = 0.0) -> list:
+        """Recommendations for one packaging calculation."""
+        recycled = bool(is_recycled)
+        entries = self._packaging.get((category, subtype, recycled, transport_mode))
+        if entries is None:
+            if category not in self.materials:
+                category, subtype = None, None
+            elif subtype not in self.materials[category]:
+                subtype = None
+            if transport_mode not in self.transport_factors:
+                transport_mode = None
+            entries = self._packaging[(category, subtype, recycled, transport_mode)]
+
+        out = []
+        for text, factors, basis in entries:
+            if basis is None:
+                out.append(text)
+                continue
+            # same operation order as the emission totals so rounding matches them
+            current, target = factors
+            if basis == "amount":
+                savings = amount * current - amount * target
+            elif transport_distance > 0:
+                savings = amount * current * transport_distance / 1000 - amount * target * transport_distance / 1000
+            else:
+                savings = 0.0
+            out.append(text.format(savings=round(savings, 2)))
+        return out
+
+    # -- industry --------------------------------------------------------
+
+    def _build_industry(self, config: dict):
+        self.trend_up = config["trend_thresholds"]["up"]
+        self.trend_down = config["trend_thresholds"]["down"]
+        rules = config["rules"]
+        industries = {i for r in rules for i in r.get("industries", ())} | {None}
+        sources = {e for r in rules for e in r.get("energy_sources", ())} | {None}
+        self._industries = industries
+        self._energy_sources = sources
+        for industry in industries:
+            for source in sources:
+                for trend in TREND_BUCKETS:
+                    picked = [
+                        r["text"] for r in rules
+                        if _matches(r, "industries", industry)
+                        and _matches(r, "energy_sources", source)
+                        and r.get("trend") in (None, trend)
+                    ]
+                    self._industry[(industry, source, trend)] = tuple(picked[:config["limit"]])
+
+    def industry(self, industry: str, energy_source: str, trend_factor: float) -> list:
+        """Recommendations for one industry prediction."""
+        if industry not in self._industries:
+            industry = None
+        if energy_source not in self._energy_sources:
+            energy_source = None
+        if trend_factor > self.trend_up:
+            trend = "up"
+        elif trend_factor < self.trend_down:
+            trend = "down"
+        else:
+            trend = None
+        return list(self._industry[(industry, energy_source, trend)])
+
+    # -- batch -----------------------------------------------------------
+
+    def batch(self, items: list) -> list:
+        """Recommendations for many inputs. Items with ``material_type`` are packaging
+        requests, everything else is treated as an industry prediction.
+
+        Raises ``ValueError`` naming the offending item and field for malformed input.
+        """
+        results = []
+        for i, item in enumerate(items):
+            if "material_type" in item:
+                results.append(self.packaging(
+                    _text(item, i, "material_type", "").lower(),
+                    _text(item, i, "material_subtype", ""),
+                    item.get("is_recycled", False),
+                    _text(item, i, "transport_mode", "truck").lower(),
+                    _number(item, i, "amount", 0),
+                    _number(item, i, "transport_distance", 0),
+                ))
+            else:
+                results.append(self.industry(
+                    _text(item, i, "industry", "").lower(),
+                    _text(item, i, "energy_source", "mixed").lower(),
+                    _number(item, i, "trend_factor", 1.0),
+                ))
+        return results
+
+
+def _text(item: dict, index: int, field: str, default: str) -> str:
+    value = item.get(field)
+    if value is None:
+        return default
+    if not isinstance(value, str):
+        raise ValueError(f"items[{index}].{field} must be a string")
+    return value
+
+
+def _number(item: dict, index: int, field: str, default: float) -> float:
+    value = item.get(field)
+    if value is None:
+        return float(default)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"items[{index}].{field} must be a number") from None
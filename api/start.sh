@@ -1,5 +1,13 @@
 #!/bin/bash
+# Production serving: gunicorn master with uvicorn workers (settings in gunicorn.conf.py).
+# Rolling reload without dropping requests:  kill -HUP $(cat /tmp/carbontracker-gunicorn.pid)
+# Set SERVER=uvicorn to fall back to the previous plain uvicorn setup.
 while true
 do
-    uvicorn main:app --host=0.0.0.0 --workers=2
-done    
+    if [ "$SERVER" = "uvicorn" ]; then
+        uvicorn main:app --host=0.0.0.0 --workers=2
+    else
+        gunicorn -c gunicorn.conf.py main:app
+    fi
+    sleep 1
+done